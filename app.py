@@ -1,9 +1,9 @@
 import streamlit as st
-import pandas as pd
-import io
+import time
 
 # ---------------- CONFIG ----------------
 FREE_DAILY_LIMIT = 5
+QUOTA_TTL_SECONDS = 30
 
 # ---------------- DB ----------------
 from utils.db import (
@@ -12,14 +12,15 @@ from utils.db import (
     can_use,
     increment_usage,
     remaining_quota,
-    save_file_history,
+    save_file_history_bulk,
     get_file_history,
     get_user_plan,
 )
 
 # ---------------- CORE ----------------
 from utils.excel_cleaner import (
-    smart_clean_sheets_from_bytes,
+    read_excel_sheets,
+    smart_clean_sheets,
     make_excel_bytes_from_sheets,
 )
 from utils.ai_insights import generate_ai_insights
@@ -28,9 +29,47 @@ from utils.ai_insights import generate_ai_insights
 st.set_page_config(page_title="SheetHub", layout="centered")
 init_db()
 
+# ---------------- CACHE ----------------
+# Reruns (any widget toggle) re-enter the pipeline; memoize by file content
+@st.cache_data(show_spinner=False, max_entries=16)
+def parse_workbook(file_bytes: bytes) -> dict:
+    return read_excel_sheets(file_bytes)
+
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def clean_workbook(
+    file_bytes: bytes,
+    apply_standardize: bool,
+    remove_summary: bool,
+    summary_keywords: tuple,
+    remove_dupes: bool,
+    drop_missing: bool,
+) -> tuple[dict, dict]:
+    return smart_clean_sheets(
+        parse_workbook(file_bytes),
+        apply_standardize,
+        remove_summary,
+        list(summary_keywords),
+        remove_dupes,
+        None,
+        drop_missing,
+    )
+
+
 # ---------------- SESSION ----------------
 st.session_state.setdefault("user_id", None)
 st.session_state.setdefault("email", None)
+st.session_state.setdefault("plan", None)
+st.session_state.setdefault("quota", None)  # (remaining, fetched_at)
+
+
+def session_quota(user_id: int) -> int:
+    cached = st.session_state.quota
+    if cached is None or time.time() - cached[1] > QUOTA_TTL_SECONDS:
+        cached = (remaining_quota(user_id), time.time())
+        st.session_state.quota = cached
+    return cached[0]
+
 
 # ---------------- LOGIN ----------------
 if st.session_state.user_id is None:
@@ -43,13 +82,16 @@ if st.session_state.user_id is None:
         else:
             st.session_state.user_id = get_or_create_user(email)
             st.session_state.email = email
+            st.session_state.plan = get_user_plan(st.session_state.user_id)
             st.success("Logged in successfully ✅")
             st.rerun()
 
     st.stop()
 
 user_id = st.session_state.user_id
-is_pro = get_user_plan(user_id) == "pro"
+if st.session_state.plan is None:
+    st.session_state.plan = get_user_plan(user_id)
+is_pro = st.session_state.plan == "pro"
 
 # ---------------- UI ----------------
 st.title("📊 SheetHub — Smart Excel Cleaner")
@@ -76,7 +118,7 @@ st.sidebar.markdown("### 📊 Daily Usage")
 if is_pro:
     st.sidebar.success("Unlimited files")
 else:
-    remaining = remaining_quota(user_id)
+    remaining = session_quota(user_id)
     st.sidebar.progress((FREE_DAILY_LIMIT - remaining) / FREE_DAILY_LIMIT)
     st.sidebar.caption(f"{remaining} / {FREE_DAILY_LIMIT} files left today")
 
@@ -117,7 +159,7 @@ if st.sidebar.button("Notify me when PRO launches"):
     st.sidebar.success("✅ You’ll be notified!")
 
 # ---------------- HARD LIMIT ----------------
-if not is_pro and remaining_quota(user_id) <= 0:
+if not is_pro and session_quota(user_id) <= 0:
     st.warning(
         "🚫 Free plan limit reached (5 files/day).\n\n"
         "PRO will unlock unlimited files."
@@ -139,36 +181,23 @@ any_success = False
 
 if files:
     for file in files:
+        # Decides whether a file is processed, so ask the DB-backed check
+        # (its cache is cleared by every increment_usage, in any session)
+        # rather than this session's possibly stale copy
         if not is_pro and not can_use(user_id):
             st.error("🚫 Free plan limit reached.")
             break
 
         file_bytes = file.read()
 
-        # Read raw safely
-        try:
-            raw_sheets = pd.read_excel(
-                io.BytesIO(file_bytes),
-                sheet_name=None,
-                engine="openpyxl",
-            )
-            original_rows = {k: len(v) for k, v in raw_sheets.items()}
-        except Exception:
-            st.error(
-                "❌ This Excel file is corrupted or exported incorrectly.\n\n"
-                "Fix: Open it in Excel → Save As → Excel Workbook (.xlsx)"
-            )
-            continue
-
-        # Clean
+        # Read + clean (a corrupted file surfaces here as ValueError)
         try:
-            cleaned = smart_clean_sheets_from_bytes(
+            cleaned, original_rows = clean_workbook(
                 file_bytes,
                 apply_standardize,
                 remove_summary,
-                summary_keywords,
+                tuple(summary_keywords),
                 remove_dupes,
-                None,
                 drop_missing,
             )
         except Exception as e:
@@ -178,8 +207,10 @@ if files:
         # Success
         any_success = True
         increment_usage(user_id)
+        st.session_state.quota = None
 
         st.markdown("### 🧾 Cleaning Summary")
+        history = []
         for sheet, df in cleaned.items():
             removed = original_rows.get(sheet, 0) - len(df)
             st.write(
@@ -188,7 +219,8 @@ if files:
                 f"Removed: {removed} | "
                 f"Final: {len(df)} rows × {df.shape[1]} columns"
             )
-            save_file_history(user_id, file.name, len(df), df.shape[1])
+            history.append((file.name, len(df), df.shape[1]))
+        save_file_history_bulk(user_id, history)
 
         # ---------------- AI INSIGHTS (FREE) ----------------
         st.markdown("## 🤖 AI Insights (Auto-generated)")
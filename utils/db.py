@@ -1,7 +1,10 @@
 # utils/db.py
 import sqlite3
+import threading
 from datetime import datetime
 
+import streamlit as st
+
 DB_PATH = "sheethub.db"
 DAILY_LIMIT = 5
 
@@ -9,13 +12,28 @@ DAILY_LIMIT = 5
 # -----------------------------
 # Connection helper
 # -----------------------------
+# One autocommit connection per thread instead of a connect() per query.
+# Streamlit starts a fresh ScriptRunner thread for every rerun, so this is
+# one connection per script run: concurrent runs never share a connection
+# (or each other's transactions), and the queries within a run reuse it.
+_LOCAL = threading.local()
+
+
 def get_conn():
-    return sqlite3.connect(DB_PATH, check_same_thread=False)
+    conn = getattr(_LOCAL, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(DB_PATH, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        _LOCAL.conn = conn
+    return conn
 
 
 # -----------------------------
 # Init DB (SAFE)
 # -----------------------------
+# The schema only needs creating once per process, not on every rerun
+@st.cache_resource(show_spinner=False)
 def init_db():
     conn = get_conn()
     cur = conn.cursor()
@@ -51,8 +69,11 @@ def init_db():
         )
     """)
 
-    conn.commit()
-    conn.close()
+    # Recent-files lookup (usage is already keyed by user_id, date)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_history_user_time
+        ON file_history (user_id, created_at DESC)
+    """)
 
 
 # -----------------------------
@@ -72,13 +93,12 @@ def get_or_create_user(email: str) -> int:
             "INSERT INTO users (email, plan) VALUES (?, 'free')",
             (email,),
         )
-        conn.commit()
         user_id = cur.lastrowid
 
-    conn.close()
     return user_id
 
 
+@st.cache_data(ttl=30, show_spinner=False)
 def get_user_plan(user_id: int) -> str:
     conn = get_conn()
     cur = conn.cursor()
@@ -86,7 +106,6 @@ def get_user_plan(user_id: int) -> str:
     cur.execute("SELECT plan FROM users WHERE id = ?", (user_id,))
     row = cur.fetchone()
 
-    conn.close()
     return row[0] if row else "free"
 
 
@@ -99,13 +118,14 @@ def upgrade_to_pro(user_id: int):
         (user_id,),
     )
 
-    conn.commit()
-    conn.close()
+    get_user_plan.clear()
+    remaining_quota.clear()
 
 
 # -----------------------------
 # Usage limits
 # -----------------------------
+@st.cache_data(ttl=30, show_spinner=False)
 def remaining_quota(user_id: int) -> int:
     # Pro users have unlimited usage
     if get_user_plan(user_id) == "pro":
@@ -121,7 +141,6 @@ def remaining_quota(user_id: int) -> int:
         (user_id, today),
     )
     row = cur.fetchone()
-    conn.close()
 
     used = row[0] if row else 0
     return max(0, DAILY_LIMIT - used)
@@ -154,8 +173,7 @@ def increment_usage(user_id: int):
         (user_id, today),
     )
 
-    conn.commit()
-    conn.close()
+    remaining_quota.clear()
 
 
 # -----------------------------
@@ -179,10 +197,34 @@ def save_file_history(user_id: int, file_name: str, rows: int, columns: int):
         ),
     )
 
-    conn.commit()
-    conn.close()
+    get_file_history.clear()
+
+
+def save_file_history_bulk(user_id: int, rows: list[tuple[str, int, int]]):
+    if not rows:
+        return
+
+    conn = get_conn()
+    cur = conn.cursor()
+    created_at = datetime.utcnow().isoformat()
+
+    # One transaction for all sheets instead of a commit per row. The
+    # connection is this thread's own, and IMMEDIATE takes the write lock
+    # up front; `with conn` commits, or rolls back on error.
+    cur.execute("BEGIN IMMEDIATE")
+    with conn:
+        cur.executemany(
+            """
+            INSERT INTO file_history (user_id, file_name, rows, columns, created_at)
+            VALUES (?, ?, ?, ?, ?)
+            """,
+            [(user_id, name, r, c, created_at) for name, r, c in rows],
+        )
+
+    get_file_history.clear()
 
 
+@st.cache_data(ttl=30, show_spinner=False)
 def get_file_history(user_id: int):
     conn = get_conn()
     cur = conn.cursor()
@@ -199,5 +241,4 @@ def get_file_history(user_id: int):
     )
 
     rows = cur.fetchall()
-    conn.close()
     return rows
@@ -1,21 +1,59 @@
-import pandas as pd
+import numpy as np
+import datetime
 import io
+import os
 import re
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+# FireDucks is a multithreaded drop-in for pandas; use it when installed
+try:
+    import fireducks.pandas as pd
+except ImportError:
+    import pandas as pd
 from .header_detection import detect_header_row
-from openpyxl.utils import get_column_letter
+from openpyxl import load_workbook
+from pandas.errors import EmptyDataError
+from pandas.io.parsers import TextParser
+import xlsxwriter
+
+HEADER_FORMAT = {"bold": True, "border": 1, "align": "center", "valign": "top"}
+
+# Number formats for cell types the workbook's default date format would
+# misrender (a time of day as 1900-01-00 09:30:00, a duration as a date)
+CELL_NUM_FORMATS = {
+    datetime.date: "yyyy-mm-dd",
+    datetime.time: "hh:mm:ss",
+    datetime.timedelta: "[h]:mm:ss",
+    pd.Timedelta: "[h]:mm:ss",
+}
+_needs_num_format = np.frompyfunc(lambda v: type(v) in CELL_NUM_FORMATS, 1, 1)
+
+MAX_SHEET_WORKERS = 8
+WRITE_CHUNK_ROWS = 10_000
+
+# python-calamine (Rust parser) is much faster than openpyxl when installed
+try:
+    import python_calamine  # noqa: F401
+    EXCEL_ENGINE = "calamine"
+except ImportError:
+    EXCEL_ENGINE = "openpyxl"
 
 # ======================================================
 # SAFE SINGLE SHEET CLEAN
 # ======================================================
 def clean_single_sheet_from_raw(df_raw: pd.DataFrame, header_idx: int) -> pd.DataFrame:
     header_row = df_raw.iloc[header_idx]
-    data = df_raw.iloc[header_idx + 1 :].copy()
+    data = df_raw.iloc[header_idx + 1 :]
 
     if data.empty:
         return pd.DataFrame()
 
-    # Remove fully empty columns early
-    data = data.dropna(axis=1, how="all")
+    # Remove fully empty rows and columns in one take, before __row_id__
+    # is added (it is never empty and would keep blank rows alive)
+    notna = data.notna().to_numpy()
+    data = data.loc[notna.any(axis=1), notna.any(axis=0)]
 
     # Track original row order
     data["__row_id__"] = range(len(data))
@@ -37,31 +75,29 @@ def clean_single_sheet_from_raw(df_raw: pd.DataFrame, header_idx: int) -> pd.Dat
         )
     data.columns = fixed_cols
 
-    # Drop empty rows
-    data = data.dropna(how="all")
-
-    # Drop empty columns again (safety)
-    data = data.dropna(axis=1, how="all")
-
     return data
 
 
 # ======================================================
 # COLUMN STANDARDIZATION
 # ======================================================
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_WS_RE = re.compile(r"\s+")
+
+
 def standardize_column_names(df: pd.DataFrame) -> pd.DataFrame:
     def snake(s):
-        s = re.sub(r"[^\w\s]", "", str(s).lower())
-        return re.sub(r"\s+", "_", s).strip("_") or "column"
+        s = _PUNCT_RE.sub("", str(s).lower())
+        return _WS_RE.sub("_", s).strip("_") or "column"
 
-    seen = {}
+    seen = Counter()
     cols = []
 
     for c in df.columns:
         base = snake(c)
-        seen[base] = seen.get(base, 0)
-        cols.append(base if seen[base] == 0 else f"{base}_{seen[base]}")
-        seen[base] += 1
+        n = seen[base]
+        seen[base] = n + 1
+        cols.append(base if n == 0 else f"{base}_{n}")
 
     df.columns = cols
     return df
@@ -70,21 +106,28 @@ def standardize_column_names(df: pd.DataFrame) -> pd.DataFrame:
 # ======================================================
 # DROP UNNAMED NUMERIC COLUMNS (🔥 KEY FIX)
 # ======================================================
-def drop_unnamed_numeric_columns(df: pd.DataFrame, threshold: float = 0.8) -> pd.DataFrame:
-    cols_to_drop = []
+def _unnamed_numeric_keep(df: pd.DataFrame, threshold: float = 0.8) -> np.ndarray:
+    keep = np.ones(df.shape[1], dtype=bool)
+    candidates = np.array([str(c).startswith("column_") for c in df.columns], dtype=bool)
+    if not candidates.any():
+        return keep
+
+    # Coerce all candidate columns in one frame-level pass
+    sub = df.loc[:, candidates]
+    present = sub.notna().to_numpy().sum(axis=0)
+    numeric = sub.apply(pd.to_numeric, errors="coerce").notna().to_numpy().sum(axis=0)
+
+    # Empty columns go too; the ratio is over non-empty cells only
+    ratio = np.divide(numeric, present, out=np.zeros(len(present)), where=present > 0)
+    drop = (present == 0) | (ratio >= threshold)
 
-    for col in df.columns:
-        if col.startswith("column_"):
-            non_null = df[col].dropna()
-            if non_null.empty:
-                cols_to_drop.append(col)
-                continue
+    keep[candidates] = ~drop
+    return keep
 
-            numeric_ratio = pd.to_numeric(non_null, errors="coerce").notna().mean()
-            if numeric_ratio >= threshold:
-                cols_to_drop.append(col)
 
-    return df.drop(columns=cols_to_drop)
+def drop_unnamed_numeric_columns(df: pd.DataFrame, threshold: float = 0.8) -> pd.DataFrame:
+    keep = _unnamed_numeric_keep(df, threshold)
+    return df if keep.all() else df.loc[:, keep]
 
 
 # ======================================================
@@ -92,86 +135,276 @@ def drop_unnamed_numeric_columns(df: pd.DataFrame, threshold: float = 0.8) -> pd
 # ======================================================
 def remove_summary_rows(df: pd.DataFrame, keywords: list[str]) -> pd.DataFrame:
     keys = [k.lower() for k in keywords]
+    if not keys or df.empty:
+        return df
 
-    def is_summary(row):
-        return any(
-            any(k in str(v).lower() for k in keys)
-            for v in row if pd.notna(v)
-        )
+    # One compiled pattern per call
+    pattern = re.compile("|".join(map(re.escape, keys)))
 
-    return df.loc[~df.apply(is_summary, axis=1)]
+    # Match all non-empty cells in one flat pass instead of column by column
+    arr = df.to_numpy(dtype=object)
+    notna = pd.notna(arr)
+    hits = np.zeros(arr.shape, dtype=bool)
+    hits[notna] = (
+        pd.Series(arr[notna], dtype=object)
+        .astype(str)
+        .str.lower()
+        .str.contains(pattern)
+        .to_numpy(dtype=bool)
+    )
+
+    return df.loc[~hits.any(axis=1)]
 
 
 # ======================================================
 # SMART DEDUPLICATION
 # ======================================================
+def _row_density(df: pd.DataFrame) -> np.ndarray:
+    # Non-empty cells per row, accumulated column by column so no bool
+    # frame the size of df is built. __row_id__ is never empty and would
+    # only add the same constant to every row.
+    score = np.zeros(len(df), dtype=np.intp)
+    for i, c in enumerate(df.columns):
+        if c != "__row_id__":
+            score += df.iloc[:, i].notna().to_numpy()
+    return score
+
+
 def smart_deduplicate(df: pd.DataFrame, subset: list[str]) -> pd.DataFrame:
-    subset = [c for c in (subset or []) if c in df.columns]
-    if not subset:
+    # Key columns by position: a repeated label (two "employeeid" headers)
+    # contributes every column that carries it, as in duplicated(subset=...)
+    wanted = set(subset or [])
+    key_pos = [j for j, c in enumerate(df.columns) if c in wanted]
+    if not key_pos:
         return df.drop_duplicates()
 
-    df["_score"] = df.notna().sum(axis=1)
-    df = df.sort_values("_score", ascending=False)
-    df = df.drop_duplicates(subset=subset, keep="first")
-    return df.drop(columns="_score")
+    # Hash each key column once; the duplicate test and the grouping both
+    # run on the integer codes (NaN gets a code of its own, as in
+    # duplicated and dropna=False)
+    codes = pd.DataFrame(
+        {
+            i: pd.factorize(df.iloc[:, j], use_na_sentinel=False)[0]
+            for i, j in enumerate(key_pos)
+        }
+    )
+
+    # Nothing to resolve when every key is unique
+    dup = codes.duplicated(keep=False).to_numpy()
+    if not dup.any():
+        return df
+
+    # Keep the most complete row per key, scoring only the duplicated rows:
+    # hash groupby + argmax, no sort of the frame. idxmax picks the first
+    # row on ties.
+    dup_rows = np.flatnonzero(dup)
+    score = pd.Series(_row_density(df.iloc[dup_rows]))
+    best = (
+        score.groupby(
+            [codes.iloc[dup_rows, i].to_numpy() for i in range(len(key_pos))],
+            sort=False,
+        )
+        .idxmax()
+        .to_numpy()
+    )
+
+    keep = ~dup
+    keep[dup_rows[best]] = True
+    return df.iloc[np.flatnonzero(keep)]
+
+
+# ======================================================
+# DTYPE OPTIMIZATION
+# ======================================================
+def _optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    for i in range(df.shape[1]):
+        s = df.iloc[:, i]
+        if not (pd.api.types.is_object_dtype(s) or pd.api.types.is_string_dtype(s)):
+            continue
+
+        kind = pd.api.types.infer_dtype(s, skipna=True)
+
+        # Only cells that already hold numbers; numeric-looking text such
+        # as zero-padded codes stays as text
+        if kind in ("integer", "floating", "mixed-integer-float"):
+            num = pd.to_numeric(s, downcast="integer")
+            if num.dtype.kind == "f":
+                f32 = num.astype(np.float32)
+                if (f32 == num)[num.notna()].all():
+                    num = f32
+            df.isetitem(i, num)
+
+        elif kind == "string" and s.nunique() < 0.5 * len(s):
+            df.isetitem(i, s.astype("category"))
+
+    return df
 
 
 # ======================================================
 # MAIN PIPELINE
 # ======================================================
-def smart_clean_sheets_from_bytes(
-    file_bytes: bytes,
-    apply_standardize: bool,
-    remove_summary: bool,
-    summary_keywords: list[str],
-    remove_dupes: bool,
-    dup_subset_map,
-    drop_missing: bool,
-) -> dict:
+def _excel_cell(v):
+    # read_excel's openpyxl cell conversion: blanks become "" and whole
+    # floats become ints, so the parser below sees the same input
+    if v is None:
+        return ""
+    if type(v) is float and v.is_integer():
+        return int(v)
+    return v
+
+
+def _read_sheets_openpyxl(file_bytes: bytes) -> dict:
+    # Stream rows straight out of a read-only workbook instead of going
+    # through pd.read_excel's per-cell openpyxl objects
+    wb = load_workbook(io.BytesIO(file_bytes), read_only=True, data_only=True)
     try:
-        raw_sheets = pd.read_excel(
-            io.BytesIO(file_bytes),
-            sheet_name=None,
-            header=None,
-            engine="openpyxl",
-        )
+        sheets = {}
+        for ws in wb.worksheets:
+            # Read-only sheets stop at the declared <dimension ref>, which
+            # some writers get wrong; rescan the real extent like pandas does
+            ws.reset_dimensions()
+            rows = [
+                [_excel_cell(v) for v in row]
+                for row in ws.iter_rows(values_only=True)
+            ]
+
+            # Formatted-but-blank cells on the right and rows at the bottom
+            # are not data
+            for row in rows:
+                while row and row[-1] == "":
+                    row.pop()
+            while rows and not rows[-1]:
+                rows.pop()
+
+            width = max((len(row) for row in rows), default=0)
+            rows = [row + [""] * (width - len(row)) for row in rows]
+
+            # Same parser read_excel hands sheet data to: default NA values,
+            # numeric and boolean inference on text cells, column dtypes
+            try:
+                df = TextParser(rows, header=None, skip_blank_lines=False).read()
+            except EmptyDataError:
+                df = pd.DataFrame()
+            sheets[ws.title] = pd.DataFrame(df)
+        return sheets
+    finally:
+        wb.close()
+
+
+def read_excel_sheets(file_bytes: bytes) -> dict:
+    try:
+        if EXCEL_ENGINE == "calamine":
+            return pd.read_excel(
+                io.BytesIO(file_bytes),
+                sheet_name=None,
+                header=None,
+                engine="calamine",
+            )
+        return _read_sheets_openpyxl(file_bytes)
     except Exception:
         raise ValueError(
             "This Excel file is corrupted or exported incorrectly.\n\n"
             "Fix: Open it in Excel → Save As → Excel Workbook (.xlsx)"
         )
 
-    cleaned = {}
 
-    for sheet, df_raw in raw_sheets.items():
-        if df_raw.empty:
-            cleaned[sheet] = pd.DataFrame()
-            continue
+def _project_output(df: pd.DataFrame, drop_missing: bool) -> pd.DataFrame:
+    # Unnamed-numeric drop, dropna, row-order restore and reset_index
+    # fused into a single iloc take instead of a copy per step
+    keep_cols = _unnamed_numeric_keep(df)
+
+    if "__row_id__" in df.columns:
+        is_row_id = np.asarray(df.columns == "__row_id__")
+        row_id = df.iloc[:, np.flatnonzero(is_row_id)[0]].to_numpy()
+        order = np.argsort(row_id, kind="stable")
+        keep_cols &= ~is_row_id
+    else:
+        order = np.arange(len(df))
 
-        header_idx = detect_header_row(df_raw)
-        df = clean_single_sheet_from_raw(df_raw, header_idx)
+    if drop_missing:
+        complete = df.loc[:, keep_cols].notna().to_numpy().all(axis=1)
+        order = order[complete[order]]
 
-        if apply_standardize:
-            df = standardize_column_names(df)
+    return df.iloc[order, np.flatnonzero(keep_cols)].reset_index(drop=True)
 
-        if remove_summary:
-            df = remove_summary_rows(df, summary_keywords)
 
-        if remove_dupes:
-            df = smart_deduplicate(df, ["employeeid"])
+def _clean_one(df_raw: pd.DataFrame, steps: list, drop_missing: bool) -> pd.DataFrame:
+    # A header row alone (or nothing) leaves no data to clean
+    if len(df_raw) <= 1 or df_raw.empty:
+        return pd.DataFrame()
+
+    header_idx = detect_header_row(df_raw)
+    df = clean_single_sheet_from_raw(df_raw, header_idx)
 
-        # 🔥 DROP unnamed numeric junk columns
-        df = drop_unnamed_numeric_columns(df)
+    for step in steps:
+        df = step(df)
 
-        if drop_missing:
-            df = df.dropna()
+    return _optimize_dtypes(_project_output(df, drop_missing))
 
-        # Restore original row order
-        if "__row_id__" in df.columns:
-            df = df.sort_values("__row_id__").drop(columns="__row_id__")
 
-        cleaned[sheet] = df.reset_index(drop=True)
+def smart_clean_sheets(
+    raw_sheets: dict,
+    apply_standardize: bool,
+    remove_summary: bool,
+    summary_keywords: list[str],
+    remove_dupes: bool,
+    dup_subset_map,
+    drop_missing: bool,
+) -> tuple[dict, dict]:
+    # Resolve the option flags once, not per sheet
+    steps = []
+    if apply_standardize:
+        steps.append(standardize_column_names)
+    if remove_summary:
+        steps.append(partial(remove_summary_rows, keywords=summary_keywords))
+    if remove_dupes:
+        steps.append(partial(smart_deduplicate, subset=["employeeid"]))
+
+    # 🔥 Unnamed numeric junk columns and (optionally) incomplete rows are
+    # dropped in the final projection, see _project_output
+
+    # Raw sheets are read without a header, so the first row is not data
+    original_rows = {
+        sheet: max(len(df_raw) - 1, 0) for sheet, df_raw in raw_sheets.items()
+    }
+
+    # Sheets are independent and most of the work happens in pandas
+    # kernels that release the GIL, so clean them concurrently. More
+    # workers than cores (or a pool for one worker) only adds overhead.
+    workers = min(MAX_SHEET_WORKERS, os.cpu_count() or 1, len(raw_sheets))
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            futures = {
+                sheet: ex.submit(_clean_one, df_raw, steps, drop_missing)
+                for sheet, df_raw in raw_sheets.items()
+            }
+            cleaned = {sheet: f.result() for sheet, f in futures.items()}
+    else:
+        cleaned = {
+            sheet: _clean_one(df_raw, steps, drop_missing)
+            for sheet, df_raw in raw_sheets.items()
+        }
+
+    return cleaned, original_rows
+
 
+def smart_clean_sheets_from_bytes(
+    file_bytes: bytes,
+    apply_standardize: bool,
+    remove_summary: bool,
+    summary_keywords: list[str],
+    remove_dupes: bool,
+    dup_subset_map,
+    drop_missing: bool,
+) -> dict:
+    cleaned, _ = smart_clean_sheets(
+        read_excel_sheets(file_bytes),
+        apply_standardize,
+        remove_summary,
+        summary_keywords,
+        remove_dupes,
+        dup_subset_map,
+        drop_missing,
+    )
     return cleaned
 
 
@@ -181,13 +414,63 @@ def smart_clean_sheets_from_bytes(
 def make_excel_bytes_from_sheets(sheets: dict) -> io.BytesIO:
     out = io.BytesIO()
 
-    with pd.ExcelWriter(out, engine="openpyxl") as writer:
-        for name, df in sheets.items():
-            df.to_excel(writer, index=False, sheet_name=name[:31])
-            ws = writer.book[name[:31]]
-            ws.freeze_panes = "A2"
-            for col in ws.columns:
-                ws.column_dimensions[get_column_letter(col[0].column)].width = 15
-
+    # constant_memory flushes each row once the next one starts, so the
+    # workbook never holds the whole sheet. Rows must be written in order,
+    # which is why this drives xlsxwriter directly instead of df.to_excel.
+    # strings_to_urls is off: cells are written as the text they hold, and
+    # no URL regex runs on every string.
+    wb = xlsxwriter.Workbook(
+        out,
+        {
+            "constant_memory": True,
+            "strings_to_urls": False,
+            "default_date_format": "yyyy-mm-dd hh:mm:ss",
+        },
+    )
+    header_fmt = wb.add_format(HEADER_FORMAT)
+    cell_fmts = {
+        t: wb.add_format({"num_format": f}) for t, f in CELL_NUM_FORMATS.items()
+    }
+
+    for name, df in sheets.items():
+        ws = wb.add_worksheet(name[:31])
+        ws.freeze_panes(1, 0)
+        if df.shape[1]:
+            ws.set_column(0, df.shape[1] - 1, 15)
+
+        ws.write_row(0, 0, list(df.columns), header_fmt)
+
+        # Empty rows are filtered in pandas, not on the worksheet
+        rows = np.flatnonzero(df.notna().to_numpy().any(axis=1))
+
+        # Only object and timedelta columns can hold dates, times or
+        # durations; rows holding one are written cell by cell with formats
+        typed_cols = [
+            j for j, dt in enumerate(df.dtypes) if dt == object or dt.kind == "m"
+        ]
+
+        # Convert to Python values a chunk at a time so no full object
+        # copy of the sheet is held next to the streaming writer
+        i = 1
+        for start in range(0, len(rows), WRITE_CHUNK_ROWS):
+            chunk = df.iloc[rows[start : start + WRITE_CHUNK_ROWS]].astype(object)
+            chunk = chunk.where(chunk.notna(), None)
+            # write_number rejects infinities; write them as text, like
+            # df.to_excel's default inf_rep
+            chunk = chunk.replace({np.inf: "inf", -np.inf: "-inf"})
+            typed = np.zeros(len(chunk), dtype=bool)
+            if typed_cols:
+                cells = chunk.iloc[:, typed_cols].to_numpy()
+                typed = _needs_num_format(cells).astype(bool).any(axis=1)
+
+            for row, has_typed in zip(chunk.itertuples(index=False, name=None), typed):
+                if has_typed:
+                    for j, v in enumerate(row):
+                        ws.write(i, j, v, cell_fmts.get(type(v)))
+                else:
+                    ws.write_row(i, 0, row)
+                i += 1
+
+    wb.close()
     out.seek(0)
     return out
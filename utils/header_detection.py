@@ -1,7 +1,23 @@
 # utils/header_detection.py
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
 import pandas as pd
 import re
 
+# Compiled once at import; these run on every cell of the top rows
+_NUMERIC_RE = re.compile(r"[0-9,.%]+")
+_IDLIKE_RE = re.compile(r"\b(id|code|emp)[-_]?\d+")
+_HAS_DIGIT = re.compile(r"\d")
+_HAS_ALPHA = re.compile(r"[a-zA-Z]")
+
+# Small LRU of detected header rows keyed by a fingerprint of the top block
+_HEADER_CACHE: OrderedDict = OrderedDict()
+_HEADER_CACHE_SIZE = 128
+_HEADER_CACHE_LOCK = threading.Lock()
+
 def is_header_like_cell(value) -> bool:
     """
     Returns True if cell looks like a column name, not data.
@@ -14,61 +30,151 @@ def is_header_like_cell(value) -> bool:
         return False
 
     # Reject pure numbers (data)
-    if re.fullmatch(r"[0-9,.%]+", s):
+    if _NUMERIC_RE.fullmatch(s):
         return False
 
     # Reject ID-like values (EMP-001, ID123, etc.)
-    if re.search(r"\b(id|code|emp)[-_]?\d+", s.lower()):
+    if _IDLIKE_RE.search(s.lower()):
         return False
 
     # Accept words, mixed words+numbers (Salary2023)
     return True
 
 
-def detect_header_row(df_raw: pd.DataFrame) -> int:
+# Cell-wise str methods over object arrays. Cells stay Python strings, so
+# one very long cell does not pad every other cell to its width the way a
+# fixed-width <U array would.
+_to_str = np.frompyfunc(str, 1, 1)
+_strip = np.frompyfunc(str.strip, 1, 1)
+_lower = np.frompyfunc(str.lower, 1, 1)
+
+
+def _matches(pattern_fn, arr: np.ndarray) -> np.ndarray:
     """
-    Detect the most likely header row in a raw Excel sheet.
+    Boolean mask of cells where a compiled-regex method finds a match.
     """
+    return np.frompyfunc(lambda s: pattern_fn(s) is not None, 1, 1)(arr).astype(bool)
 
-    best_row = 0
-    best_score = float("-inf")
 
-    max_rows_to_check = min(len(df_raw), 20)  # headers are near top
+def _header_like_mask(
+    stripped: np.ndarray,
+    notna_mask: np.ndarray,
+    is_number: np.ndarray | None = None,
+    lowered: np.ndarray | None = None,
+) -> np.ndarray:
+    """
+    Vectorised is_header_like_cell over an array of stripped str(value) cells.
+    """
+    if is_number is None:
+        is_number = _matches(_NUMERIC_RE.fullmatch, stripped)
+    if lowered is None:
+        lowered = _lower(stripped)
+    is_id = _matches(_IDLIKE_RE.search, lowered)
+    return notna_mask & (stripped != "") & ~is_number & ~is_id
 
-    for i in range(max_rows_to_check):
-        row = df_raw.iloc[i]
 
-        non_empty = row.notna().sum()
-        if non_empty == 0:
-            continue
+def _score_rows(text: np.ndarray, notna: np.ndarray, first_row: int = 0) -> np.ndarray:
+    """
+    Header score for each row of str(value) cells (-inf for empty rows).
+    """
+    stripped = _strip(text)
+    lowered = _lower(stripped)
+
+    non_empty = notna.sum(axis=1)
+
+    # One numeric sweep serves both the header-like test and the penalty
+    is_number = notna & _matches(_NUMERIC_RE.fullmatch, stripped)
+
+    header_like = _header_like_mask(stripped, notna, is_number, lowered).sum(axis=1)
+
+    # Distinct non-empty values per row: sort each row's value codes with
+    # empty cells last, then count the places where the value changes
+    codes = pd.factorize(lowered.ravel())[0].reshape(lowered.shape)
+    order = np.lexsort((codes, ~notna), axis=-1)
+    codes_sorted = np.take_along_axis(codes, order, axis=1)
+    notna_sorted = np.take_along_axis(notna, order, axis=1)
+    unique_vals = notna_sorted[:, 0] + (
+        notna_sorted[:, 1:] & (codes_sorted[:, 1:] != codes_sorted[:, :-1])
+    ).sum(axis=1)
+
+    # Penalize rows that look like data
+    numeric_cells = is_number.sum(axis=1)
+
+    id_like_cells = (
+        notna
+        & _matches(_HAS_DIGIT.search, text)
+        & _matches(_HAS_ALPHA.search, text)
+    ).sum(axis=1)
+
+    # Prefer top rows
+    position_bonus = np.maximum(0, 10 - np.arange(first_row, first_row + len(text)))
+
+    score = (
+        (3 * header_like)
+        + unique_vals
+        - (2 * numeric_cells)
+        - id_like_cells
+        + position_bonus
+    ).astype(float)
+    score[non_empty == 0] = float("-inf")
+    return score
+
+
+def _block_fingerprint(text: np.ndarray, notna: np.ndarray) -> bytes:
+    """
+    Digest of everything the row scoring reads (cell text + empty mask).
+    """
+    # Cell lengths plus the concatenated text identify the cells exactly,
+    # without hashing any padding
+    cells = text.ravel().tolist()
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{text.shape}".encode())
+    h.update(np.fromiter(map(len, cells), dtype=np.int64, count=len(cells)).tobytes())
+    h.update("".join(cells).encode("utf-8", "surrogatepass"))
+    h.update(notna.tobytes())
+    return h.digest()
+
+
+def _best_header_row(text: np.ndarray, notna: np.ndarray) -> int:
+    # Fast path: no later row can beat 4 points per cell (3 header-like +
+    # 1 unique) plus a position bonus of 9, so a row 0 reaching that wins
+    first = _score_rows(text[:1], notna[:1])
+    if first[0] >= 4 * text.shape[1] + 9:
+        return 0
+
+    score = np.concatenate([first, _score_rows(text[1:], notna[1:], first_row=1)])
+
+    # argmax keeps the first (topmost) row on ties
+    return int(np.argmax(score))
+
+
+def detect_header_row(df_raw: pd.DataFrame) -> int:
+    """
+    Detect the most likely header row in a raw Excel sheet.
+    """
 
-        header_like = sum(is_header_like_cell(v) for v in row)
-        unique_vals = len(set(str(v).strip().lower() for v in row if pd.notna(v)))
+    # Headers are near top; score the whole block at once
+    block = df_raw.head(20).to_numpy(dtype=object)
 
-        # Penalize rows that look like data
-        numeric_cells = sum(
-            str(v).replace(".", "").replace(",", "").isdigit()
-            for v in row if pd.notna(v)
-        )
+    # Nothing to choose between
+    if block.size == 0 or len(block) == 1:
+        return 0
 
-        id_like_cells = sum(
-            bool(re.search(r"\d", str(v))) and bool(re.search(r"[a-zA-Z]", str(v)))
-            for v in row if pd.notna(v)
-        )
+    notna = ~pd.isna(block)
+    text = _to_str(np.where(notna, block, ""))
 
-        # Prefer top rows
-        position_bonus = max(0, 10 - i)
+    # Re-uploads of the same workbook skip the scoring entirely
+    key = _block_fingerprint(text, notna)
+    with _HEADER_CACHE_LOCK:
+        if key in _HEADER_CACHE:
+            _HEADER_CACHE.move_to_end(key)
+            return _HEADER_CACHE[key]
 
-        score = (
-            (3 * header_like)
-            + unique_vals
-            - (2 * numeric_cells)
-            - id_like_cells
-            + position_bonus
-        )
+    best_row = _best_header_row(text, notna)
 
-        if score > best_score:
-            best_score = score
-            best_row = i
+    with _HEADER_CACHE_LOCK:
+        _HEADER_CACHE[key] = best_row
+        if len(_HEADER_CACHE) > _HEADER_CACHE_SIZE:
+            _HEADER_CACHE.popitem(last=False)
 
     return best_row